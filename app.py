@@ -1,7 +1,7 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, abort
 from flask_cors import CORS
 import os
-import PyPDF2
+import fitz
 import docx
 import re
 from werkzeug.utils import secure_filename
@@ -11,7 +11,11 @@ import logging
 from io import BytesIO
 from urllib.parse import urlparse
 import requests
-from collections import Counter
+from collections import Counter, OrderedDict
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 
 app = Flask(__name__)
 CORS(app)
@@ -22,53 +26,143 @@ logger = logging.getLogger(__name__)
 
 # Configuration
 UPLOAD_FOLDER = tempfile.gettempdir()
-ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'txt'}
+ALLOWED_EXTENSIONS = {'pdf', 'docx', 'txt'}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+ANALYSIS_CACHE_SIZE = 256
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', os.cpu_count() or 1))
+PDF_PARSE_TIMEOUT = 30  # seconds
+# Default text flags with ligatures expanded, so 'ﬁ' is extracted as 'fi'
+PDF_TEXT_FLAGS = fitz.TEXTFLAGS_TEXT & ~fitz.TEXT_PRESERVE_LIGATURES
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 
+# Analysis results keyed by (SHA-256 of the upload, extension) so re-uploads of
+# the same resume skip extraction and scoring. Most recently used entries last.
+analysis_cache = OrderedDict()
+analysis_cache_lock = threading.Lock()
+
+# PDF parsing holds the GIL, so it runs in a process pool. The pool is created
+# on first use so that each gunicorn worker builds its own after forking.
+pdf_pool = None
+pdf_pool_lock = threading.Lock()
+
+RESUME_CRITERIA = {
+    'contact_info': {
+        'patterns': [
+            re.compile(r'email|@'),
+            re.compile(r'phone|tel|\d{3}[-.]?\d{3}[-.]?\d{4}'),
+            re.compile(r'linkedin|github')
+        ],
+        'weight': 15,
+        'suggestion': 'Include complete contact information (email, phone, LinkedIn)'
+    },
+    'experience': {
+        'patterns': [
+            re.compile(r'experience|work|job|position|role'),
+            re.compile(r'company|organization|corp')
+        ],
+        'weight': 25,
+        'suggestion': 'Add more detailed work experience with specific roles and companies'
+    },
+    'education': {
+        'patterns': [
+            re.compile(r'education|degree|university|college|school'),
+            re.compile(r'bachelor|master|phd|diploma')
+        ],
+        'weight': 20,
+        'suggestion': 'Include educational background with degrees and institutions'
+    },
+    'skills': {
+        'patterns': [
+            re.compile(r'skills|technical|programming|software'),
+            re.compile(r'python|java|javascript|html|css')
+        ],
+        'weight': 20,
+        'suggestion': 'List relevant technical and soft skills'
+    },
+    'achievements': {
+        'patterns': [
+            re.compile(r'achievement|award|project|accomplishment'),
+            re.compile(r'led|managed|developed|created')
+        ],
+        'weight': 10,
+        'suggestion': 'Highlight key achievements and projects'
+    },
+    'keywords': {
+        'patterns': [
+            re.compile(r'responsible|managed|developed|implemented|designed|created')
+        ],
+        'weight': 10,
+        'suggestion': 'Use more action verbs and industry-specific keywords'
+    }
+}
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def extract_text_from_pdf(file_path):
+def extract_text_from_pdf(data):
     try:
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            return "\n".join(page.get_text("text", flags=PDF_TEXT_FLAGS) for page in doc)
     except Exception as e:
         logger.error(f"Error extracting PDF text: {str(e)}")
         return ""
 
-def extract_text_from_docx(file_path):
+def get_pdf_pool():
+    global pdf_pool
+    with pdf_pool_lock:
+        if pdf_pool is None:
+            pdf_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+        return pdf_pool
+
+def discard_pdf_pool(pool):
+    global pdf_pool
+    with pdf_pool_lock:
+        if pdf_pool is pool:
+            pdf_pool = None
+    # A running task cannot be cancelled, so stop the worker processes directly
+    for process in list((pool._processes or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False)
+
+def extract_text_from_pdf_in_pool(data):
+    pool = get_pdf_pool()
+    future = pool.submit(extract_text_from_pdf, data)
     try:
-        doc = docx.Document(file_path)
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text
+        return future.result(timeout=PDF_PARSE_TIMEOUT)
+    except FuturesTimeoutError:
+        logger.error(f"PDF parsing timed out after {PDF_PARSE_TIMEOUT}s")
+        if not future.cancel():
+            discard_pdf_pool(pool)
+        raise
+    except BrokenProcessPool as e:
+        logger.error(f"PDF worker process died: {str(e)}")
+        discard_pdf_pool(pool)
+        raise
+
+def extract_text_from_docx(data):
+    try:
+        doc = docx.Document(BytesIO(data))
+        return "\n".join(paragraph.text for paragraph in doc.paragraphs)
     except Exception as e:
         logger.error(f"Error extracting DOCX text: {str(e)}")
         return ""
 
-def extract_text_from_txt(file_path):
+def extract_text_from_txt(data):
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            return file.read()
+        return data.decode('utf-8')
     except Exception as e:
         logger.error(f"Error extracting TXT text: {str(e)}")
         return ""
 
-def extract_text_from_file(file_path, file_extension):
+def extract_text_from_file(data, file_extension):
     if file_extension == 'pdf':
-        return extract_text_from_pdf(file_path)
+        return extract_text_from_pdf_in_pool(data)
     elif file_extension == 'docx':
-        return extract_text_from_docx(file_path)
+        return extract_text_from_docx(data)
     elif file_extension == 'txt':
-        return extract_text_from_txt(file_path)
+        return extract_text_from_txt(data)
     else:
         return ""
 
@@ -77,43 +171,10 @@ def analyze_resume_content(text):
     score = 0
     suggestions = []
 
-    criteria = {
-        'contact_info': {
-            'patterns': [r'email|@', r'phone|tel|\d{3}[-.]?\d{3}[-.]?\d{4}', r'linkedin|github'],
-            'weight': 15,
-            'suggestion': 'Include complete contact information (email, phone, LinkedIn)'
-        },
-        'experience': {
-            'patterns': [r'experience|work|job|position|role', r'company|organization|corp'],
-            'weight': 25,
-            'suggestion': 'Add more detailed work experience with specific roles and companies'
-        },
-        'education': {
-            'patterns': [r'education|degree|university|college|school', r'bachelor|master|phd|diploma'],
-            'weight': 20,
-            'suggestion': 'Include educational background with degrees and institutions'
-        },
-        'skills': {
-            'patterns': [r'skills|technical|programming|software', r'python|java|javascript|html|css'],
-            'weight': 20,
-            'suggestion': 'List relevant technical and soft skills'
-        },
-        'achievements': {
-            'patterns': [r'achievement|award|project|accomplishment', r'led|managed|developed|created'],
-            'weight': 10,
-            'suggestion': 'Highlight key achievements and projects'
-        },
-        'keywords': {
-            'patterns': [r'responsible|managed|developed|implemented|designed|created'],
-            'weight': 10,
-            'suggestion': 'Use more action verbs and industry-specific keywords'
-        }
-    }
-
-    for criterion, data in criteria.items():
+    for criterion, data in RESUME_CRITERIA.items():
         criterion_score = 0
         for pattern in data['patterns']:
-            if re.search(pattern, text_lower):
+            if pattern.search(text_lower):
                 criterion_score += data['weight'] / len(data['patterns'])
 
         score += min(criterion_score, data['weight'])
@@ -130,6 +191,27 @@ def analyze_resume_content(text):
 
     return int(score), suggestions
 
+def analyze_resume_bytes(data, file_extension):
+    key = (hashlib.sha256(data).digest(), file_extension)
+    with analysis_cache_lock:
+        if key in analysis_cache:
+            analysis_cache.move_to_end(key)
+            return analysis_cache[key]
+
+    text = extract_text_from_file(data, file_extension)
+    if not text.strip():
+        # Failures are not cached, so a transient one cannot stick to this file
+        return None
+
+    score, suggestions = analyze_resume_content(text)
+    result = (score, tuple(suggestions))
+
+    with analysis_cache_lock:
+        analysis_cache[key] = result
+        if len(analysis_cache) > ANALYSIS_CACHE_SIZE:
+            analysis_cache.popitem(last=False)
+    return result
+
 @app.route('/', methods=['GET'])
 def health_check():
     return jsonify({
@@ -140,6 +222,10 @@ def health_check():
 
 @app.route('/analyze', methods=['POST'])
 def analyze_resume():
+    # Reject oversized uploads from the header, before the body is parsed
+    if request.content_length is not None and request.content_length > MAX_FILE_SIZE:
+        abort(413)
+
     try:
         # Option 1: Analyze from URL
         if 'resume_url' in request.form:
@@ -164,39 +250,30 @@ def analyze_resume():
             return jsonify({'error': 'No file selected'}), 400
 
         if not allowed_file(file.filename):
-            return jsonify({'error': 'Invalid file type. Only PDF, DOC, DOCX, and TXT files are allowed'}), 400
+            return jsonify({'error': 'Invalid file type. Only PDF, DOCX, and TXT files are allowed'}), 400
 
         filename = secure_filename(file.filename)
         file_extension = filename.rsplit('.', 1)[1].lower()
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_extension}') as temp_file:
-            file.save(temp_file.name)
-            temp_file_path = temp_file.name
+        result = analyze_resume_bytes(file.read(), file_extension)
 
-        try:
-            text = extract_text_from_file(temp_file_path, file_extension)
+        if result is None:
+            return jsonify({'error': 'Could not extract text from the file'}), 400
 
-            if not text.strip():
-                return jsonify({'error': 'Could not extract text from the file'}), 400
+        score, suggestions = result
 
-            score, suggestions = analyze_resume_content(text)
-
-            response = {
-                'score': score,
-                'suggestions': suggestions,
-                'analysis_date': datetime.now().isoformat(),
-                'file_processed': filename
-            }
-
-            logger.info(f"Resume analyzed successfully: {filename}, Score: {score}")
-            return jsonify(response)
+        response = {
+            'score': score,
+            'suggestions': list(suggestions),
+            'analysis_date': datetime.now().isoformat(),
+            'file_processed': filename
+        }
 
-        finally:
-            try:
-                os.unlink(temp_file_path)
-            except Exception as e:
-                logger.warning(f"Could not delete temporary file: {str(e)}")
+        logger.info(f"Resume analyzed successfully: {filename}, Score: {score}")
+        return jsonify(response)
 
+    except FuturesTimeoutError:
+        return jsonify({'error': 'Timed out extracting text from the PDF'}), 400
     except Exception as e:
         logger.error(f"Error analyzing resume: {str(e)}")
         return jsonify({'error': 'An error occurred while analyzing the resume'}), 500